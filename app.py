@@ -1,7 +1,8 @@
+import time
+T_START = time.perf_counter()
 import os
 import sys
 import json
-import time
 import sqlite3
 import threading
 import subprocess
@@ -9,43 +10,33 @@ from pathlib import Path
 from collections import deque
 import cv2
 import numpy as np
-from ultralytics import YOLO
-import pyttsx3
-import pandas as pd
-import requests
 
 # PyQt5 imports
 from PyQt5 import QtWidgets, QtGui, QtCore
-from flask import Flask, jsonify
 
-# Face recognition
-import face_recognition
+from camera_manager import CameraManager
+# heavy deps (ultralytics/torch, face_recognition/dlib, pandas, pyttsx3, flask, requests)
+# are imported on first use; the model, tracker and face gallery load in the background
+from startup import lazy_import, BackgroundLoader
 
 # Tracker imports (selectable)
 TRACKER = os.getenv("TRACKER", "deepsort").lower()  # 'deepsort' or 'bytetrack'
 
-# try to import ByteTrack if requested
-bytetrack_available = False
-if TRACKER == "bytetrack":
-    try:
-        # after pip-install from GitHub, module path may vary; try common ones
-        from yolox.tracker.byte_tracker import BYTETracker
-        from yolox.tracker.tracker_config import TrackerConfig
-        bytetrack_available = True
-    except Exception:
+def import_bytetrack():
+    # after pip-install from GitHub, module path may vary; try common ones
+    for mod in ("yolox.tracker.byte_tracker", "bytetrack.byte_tracker"):
         try:
-            # alternate name
-            from bytetrack.byte_tracker import BYTETracker
-            bytetrack_available = True
+            return lazy_import(mod).BYTETracker
         except Exception:
-            bytetrack_available = False
+            pass
+    return None
 
-# deep-sort import fallback
-try:
-    from deep_sort_realtime.deepsort_tracker import DeepSort
-    deepsort_available = True
-except Exception:
-    deepsort_available = False
+def import_deepsort():
+    # deep-sort import fallback
+    try:
+        return lazy_import("deep_sort_realtime.deepsort_tracker").DeepSort
+    except Exception:
+        return None
 
 # Paths
 BASE = Path(__file__).parent
@@ -65,16 +56,22 @@ MODEL_WEIGHTS = os.getenv("YOLO_WEIGHTS", "yolov8n.pt")
 UPLOAD_METHOD = os.getenv("UPLOAD_METHOD", "")  # 'rclone' or 's3'
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
 TELEGRAM_CHAT = os.getenv("TELEGRAM_CHAT", "")
+CAM_WATCH_MS = int(os.getenv("CAM_WATCH_MS", "2000"))  # cameras.json poll interval
 
-# Load model
-print("Loading YOLO model:", MODEL_WEIGHTS)
-model = YOLO(MODEL_WEIGHTS)
+# Load model (background, see loader below)
+model = None
+def load_model():
+    global model
+    print("Loading YOLO model:", MODEL_WEIGHTS)
+    model = lazy_import("ultralytics").YOLO(MODEL_WEIGHTS)
+    return model
 
 # Tracker wrapper
 class TrackerWrapper:
     def __init__(self):
         self.type = TRACKER
-        if TRACKER == "bytetrack" and bytetrack_available:
+        BYTETracker = import_bytetrack() if TRACKER == "bytetrack" else None
+        if BYTETracker is not None:
             try:
                 # create ByteTrack with default params (user can tune)
                 self.tracker = BYTETracker()
@@ -87,7 +84,8 @@ class TrackerWrapper:
             self._fallback_to_deepsort()
 
     def _fallback_to_deepsort(self):
-        if deepsort_available:
+        DeepSort = import_deepsort()
+        if DeepSort is not None:
             self.tracker = DeepSort(max_age=30)
             self.mode = "deepsort"
             print("Tracker: DeepSORT (fallback)")
@@ -122,12 +120,24 @@ class TrackerWrapper:
                 out.append(o)
             return out
 
-tracker = TrackerWrapper()
+tracker = None
+def load_tracker():
+    global tracker
+    tracker = TrackerWrapper()
+    return tracker
+
+# TTS (engine created on first alert)
+tts = None
+tts_lock = threading.Lock()
+def _say(msg):
+    global tts
+    with tts_lock:
+        if tts is None:
+            tts = lazy_import("pyttsx3").init()
+        tts.say(msg); tts.runAndWait()
 
-# TTS
-tts = pyttsx3.init()
 def speak(msg):
-    threading.Thread(target=lambda: (tts.say(msg), tts.runAndWait()), daemon=True).start()
+    threading.Thread(target=_say, args=(msg,), daemon=True).start()
 
 # DB helpers
 def get_db_conn():
@@ -143,12 +153,23 @@ def log_event_row(ts, camera, track_id, person_name, role, conf, bbox, evidence=
     conn.close()
 
 # load known faces into mem cache for speed
+# stored embeddings (face_embeddings, several per person) are used as is;
+# persons.face_path images without a stored embedding are encoded on load
 def load_face_db():
     conn = get_db_conn()
-    rows = conn.execute("SELECT name, role, face_path FROM persons WHERE face_path IS NOT NULL").fetchall()
+    stored = conn.execute("""SELECT e.person_name AS name, p.role AS role, e.image_path AS path, e.encoding AS encoding
+                             FROM face_embeddings e LEFT JOIN persons p ON p.name = e.person_name""").fetchall()
+    rows = conn.execute("""SELECT name, role, face_path FROM persons WHERE face_path IS NOT NULL
+                           AND face_path NOT IN (SELECT image_path FROM face_embeddings WHERE image_path IS NOT NULL)""").fetchall()
     conn.close()
     encs = []
     metas = []
+    for r in stored:
+        encs.append(np.frombuffer(r["encoding"], dtype=np.float64))
+        metas.append({"name": r["name"], "role": r["role"], "path": r["path"]})
+    if not rows:
+        return encs, metas
+    face_recognition = lazy_import("face_recognition")
     for r in rows:
         path = r["face_path"]
         if path and Path(path).exists():
@@ -159,7 +180,27 @@ def load_face_db():
                 metas.append({"name": r["name"], "role": r["role"], "path": path})
     return encs, metas
 
-known_encodings, known_meta = load_face_db()
+# (encodings, metas) published as one tuple so readers never mix two versions;
+# always replaced with a single assignment, never mutated in place.
+# writers (load_faces, enroll_face_from_frame) hold gallery_lock so none of
+# them publishes a snapshot that drops another one's update
+gallery = ([], [])
+gallery_lock = threading.Lock()
+def load_faces():
+    global gallery
+    with gallery_lock:
+        gallery = load_face_db()
+        return len(gallery[0])
+
+# background init: UI and cameras come up while these load; workers skip
+# inference until loader.ready is set
+loader = BackgroundLoader()
+loader.add("model", load_model)
+loader.add("tracker", load_tracker)
+# dlib is imported here even when every face has a stored embedding, so the
+# first detection in a CameraWorker does not stall on it
+loader.add("face_recognition", lambda: lazy_import("face_recognition"))
+loader.add("faces", load_faces)
 
 # event buffer (for 30s contextual description)
 event_buffer = deque()
@@ -184,23 +225,48 @@ def summarize_buffer_text():
     parts = [f"{cam}:{n}" for cam,n in by_cam.items()]
     return f"{'; '.join(parts)}; Desconocidos: {unknown}"
 
-# Flask API (background)
-api_app = Flask("cctv_api")
-@api_app.route("/api/events")
-def api_events():
-    conn = get_db_conn()
-    df = pd.read_sql("SELECT * FROM events ORDER BY id DESC LIMIT 500", conn)
-    conn.close()
-    return df.to_json(orient="records", force_ascii=False)
+# set by the API, consumed by MainWindow on the GUI thread
+camera_reload_requested = threading.Event()
+
+# Flask API (background, built on first run so importing app.py does not load flask)
+def create_api():
+    flask = lazy_import("flask")
+    jsonify = flask.jsonify
+    api_app = flask.Flask("cctv_api")
 
-@api_app.route("/api/cameras")
-def api_cameras():
-    if CAM_CONF.exists():
-        return CAM_CONF.read_text(encoding="utf-8")
-    return jsonify({"cameras":[]})
+    @api_app.route("/api/events")
+    def api_events():
+        pd = lazy_import("pandas")
+        conn = get_db_conn()
+        df = pd.read_sql("SELECT * FROM events ORDER BY id DESC LIMIT 500", conn)
+        conn.close()
+        return df.to_json(orient="records", force_ascii=False)
+
+    @api_app.route("/api/cameras")
+    def api_cameras():
+        if CAM_CONF.exists():
+            return CAM_CONF.read_text(encoding="utf-8")
+        return jsonify({"cameras":[]})
+
+    @api_app.route("/api/cameras/reload", methods=["POST"])
+    def api_cameras_reload():
+        camera_reload_requested.set()
+        return jsonify({"status": "queued"}), 202
+
+    @api_app.route("/api/faces/reload", methods=["POST"])
+    def api_faces_reload():
+        # single gallery refresh, e.g. after register_face.py bulk
+        threading.Thread(target=load_faces, daemon=True).start()
+        return jsonify({"status": "queued"}), 202
+
+    @api_app.route("/api/status")
+    def api_status():
+        return jsonify(loader.status())
+
+    return api_app
 
 def run_api():
-    api_app.run(host="0.0.0.0", port=5000, threaded=True)
+    create_api().run(host="0.0.0.0", port=5000, threaded=True)
 
 # Camera worker (QThread)
 class CameraWorker(QtCore.QThread):
@@ -220,12 +286,12 @@ class CameraWorker(QtCore.QThread):
         frame_idx = 0
         while self.running:
             if not self.cap.isOpened():
-                time.sleep(0.5); self.cap = cv2.VideoCapture(self.source); continue
+                self.cap.release(); time.sleep(0.5); self.cap = cv2.VideoCapture(self.source); continue
             ret, frame = self.cap.read()
             if not ret:
                 time.sleep(0.02); continue
             frame_idx += 1
-            if frame_idx % self.process_every == 0:
+            if frame_idx % self.process_every == 0 and loader.ready.is_set() and model is not None and tracker is not None:
                 try:
                     preds = model(frame)
                     # gather person detections
@@ -253,8 +319,10 @@ class CameraWorker(QtCore.QThread):
                         name = "Desconocido"
                         if crop.size != 0:
                             try:
+                                face_recognition = lazy_import("face_recognition")
                                 rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
                                 encs = face_recognition.face_encodings(rgb)
+                                known_encodings, known_meta = gallery
                                 if encs and known_encodings:
                                     dists = face_recognition.face_distance(known_encodings, encs[0])
                                     idx = int(np.argmin(dists))
@@ -298,6 +366,7 @@ def send_telegram(text, image_path=None):
     try:
         if not TELEGRAM_TOKEN or not TELEGRAM_CHAT:
             return False
+        requests = lazy_import("requests")
         url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
         requests.post(url, data={"chat_id": TELEGRAM_CHAT, "text": text}, timeout=5)
         if image_path and os.path.exists(image_path):
@@ -353,15 +422,37 @@ class MainWindow(QtWidgets.QMainWindow):
         bottom.addWidget(self.log_console)
         self.setCentralWidget(main)
         # state
-        self.workers = {}  # cam_name -> worker
         self.labels = {}   # cam_name -> QLabel
+        self.cameras = CameraManager(CAM_CONF, self._start_worker, self._remove_camera_widgets)
         # load cameras
         self.load_cameras(initial=True)
+        # watch cameras.json (and API reload requests) for incremental reloads
+        self.cam_timer = QtCore.QTimer(self)
+        self.cam_timer.timeout.connect(self.check_cameras_conf)
+        self.cam_timer.start(CAM_WATCH_MS)
+        # model/gallery readiness in the status bar
+        self.status_timer = QtCore.QTimer(self)
+        self.status_timer.timeout.connect(self.update_load_status)
+        self.status_timer.start(500)
+        self.update_load_status()
         # start flask API thread
         threading.Thread(target=run_api, daemon=True).start()
         # start reporter thread (calls reporter.py once each interval)
         threading.Thread(target=self.reporter_loop, daemon=True).start()
 
+    def update_load_status(self):
+        st = loader.status()
+        if not st["ready"]:
+            self.statusBar().showMessage(f"Cargando {st['loading'] or '...'} (cámaras en vista previa)")
+            return
+        self.status_timer.stop()
+        if st["errors"]:
+            msg = "Error de carga: " + "; ".join(f"{k}: {v}" for k, v in st["errors"].items())
+        else:
+            msg = f"Modelo listo ({len(gallery[0])} rostros conocidos)"
+        self.statusBar().showMessage(msg)
+        self.log_console.append(f"[{time.strftime('%H:%M:%S')}] {msg}")
+
     def reporter_loop(self):
         from subprocess import Popen
         while True:
@@ -376,52 +467,72 @@ class MainWindow(QtWidgets.QMainWindow):
         if not ok or not name: return
         source, ok = QtWidgets.QInputDialog.getText(self,"Agregar cámara","Fuente (0 para webcam o rtsp://... )")
         if not ok or not source: return
-        src = int(source) if source.isdigit() else source
-        self._add_camera(name, src)
-        self.save_cameras()
-
-    def _add_camera(self, name, src):
-        if name in self.workers:
+        if name in self.cameras.specs:
             QtWidgets.QMessageBox.warning(self,"Duplicado","Cámara ya existe")
             return
-        # list item
-        self.cam_list.addItem(name)
-        # create label in grid
-        lbl = QtWidgets.QLabel(name); lbl.setStyleSheet("background:black;color:white"); lbl.setAlignment(QtCore.Qt.AlignCenter)
-        idx = self.grid_layout.count()
-        r = idx//2; c = idx%2
-        self.grid_layout.addWidget(lbl, r, c); self.labels[name]=lbl
-        # start worker
-        w = CameraWorker(name, src)
+        self.cameras.add(name, source)
+        self._relayout_cameras()
+        self.save_cameras()
+
+    def _start_worker(self, name, spec):
+        # called by CameraManager for added/changed cameras (GUI thread)
+        lbl = self.labels.get(name)
+        if lbl is None:
+            lbl = QtWidgets.QLabel(name); lbl.setStyleSheet("background:black;color:white"); lbl.setAlignment(QtCore.Qt.AlignCenter)
+            self.labels[name] = lbl
+            if name in self.cameras.specs:
+                # deferred start (old worker just exited): place the label now
+                self._relayout_cameras()
+        w = CameraWorker(name, spec["source"], process_every=spec["process_every"])
         w.frame_signal.connect(lambda f, cam=name, lbl=lbl: self.on_frame(f, lbl, cam))
         w.alert_signal.connect(self.on_alert)
         w.start()
-        self.workers[name] = w
-        self.load_persons()
+        return w
+
+    def _remove_camera_widgets(self, name, worker):
+        # called once the removed camera's worker has exited (changed cameras keep their label)
+        try:
+            worker.frame_signal.disconnect()
+        except TypeError:
+            pass
+        lbl = self.labels.pop(name, None)
+        if lbl:
+            self.grid_layout.removeWidget(lbl); lbl.deleteLater()
+
+    def _relayout_cameras(self):
+        # re-place labels in config order; existing labels are reused, not recreated.
+        # labels of removed cameras whose worker is still exiting go last until on_removed
+        names = list(self.cameras.specs) + [n for n in self.labels if n not in self.cameras.specs]
+        for name in names:
+            lbl = self.labels.get(name)
+            if lbl:
+                self.grid_layout.removeWidget(lbl)
+        self.cam_list.clear()
+        for name in self.cameras.specs:
+            self.cam_list.addItem(name)
+        for idx, name in enumerate(n for n in names if n in self.labels):
+            self.grid_layout.addWidget(self.labels[name], idx//2, idx%2)
 
     def load_cameras(self, initial=False):
-        if not CAM_CONF.exists():
+        # the default file is only created at startup; during hot reload a missing
+        # cameras.json (editor save, git checkout) keeps the current cameras
+        if initial and not CAM_CONF.exists():
             CAM_CONF.write_text(json.dumps({"cameras":[]}, indent=2), encoding="utf-8")
-        data = json.loads(CAM_CONF.read_text(encoding="utf-8"))
-        # stop existing
-        for name,info in list(self.workers.items()):
-            info.stop()
-        self.workers.clear(); self.labels.clear()
-        while self.grid_layout.count():
-            item = self.grid_layout.takeAt(0)
-            w = item.widget()
-            if w: w.deleteLater()
-        # add cameras from config
-        for cam in data.get("cameras", []):
-            name = cam.get("name"); src = cam.get("source")
-            src = int(src) if isinstance(src, (str,)) and src.isdigit() else src
-            self._add_camera(name, src)
-        if not initial:
-            QtWidgets.QMessageBox.information(self,"Cámaras","Cargar cámaras terminado")
+        result = self.cameras.reload()
+        if result is None:
+            return
+        self._relayout_cameras()
+        self.load_persons()
+        if any(result.values()):
+            self.log_console.append(f"[{time.strftime('%H:%M:%S')}] Cámaras: +{len(result['added'])} -{len(result['removed'])} ~{len(result['changed'])}")
+
+    def check_cameras_conf(self):
+        if camera_reload_requested.is_set() or self.cameras.changed_on_disk():
+            camera_reload_requested.clear()
+            self.load_cameras()
 
     def save_cameras(self):
-        data = {"cameras":[{"name":k,"source":v["worker"].source if isinstance(v["worker"].source,str) or isinstance(v["worker"].source,int) else v["worker"].source} for k,v in self.workers.items()]}
-        CAM_CONF.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        self.cameras.save()
         QtWidgets.QMessageBox.information(self,"Guardado","cameras.json actualizado")
 
     def on_frame(self, frame, label, cam):
@@ -471,6 +582,7 @@ class MainWindow(QtWidgets.QMainWindow):
         QtWidgets.QMessageBox.information(self,"Vinculado", f"Track {tid} vinculado a {pname}")
 
     def export_events(self):
+        pd = lazy_import("pandas")
         conn = get_db_conn()
         df = pd.read_sql("SELECT * FROM events ORDER BY id DESC LIMIT 1000", conn)
         conn.close()
@@ -479,15 +591,16 @@ class MainWindow(QtWidgets.QMainWindow):
         QtWidgets.QMessageBox.information(self,"Exportado", f"Events exportados a {csvf}")
 
     def closeEvent(self, event):
-        for w in list(self.workers.values()):
-            try:
-                w.stop()
-            except:
-                pass
+        self.cam_timer.stop()
+        try:
+            self.cameras.stop_all()
+        except Exception as e:
+            print("camera stop err", e)
         super().closeEvent(event)
 
 # register face helper (GUI also calls register_face.py)
 def enroll_face_from_frame(name, role, frame):
+    face_recognition = lazy_import("face_recognition")
     rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     boxes = face_recognition.face_locations(rgb)
     if not boxes:
@@ -496,14 +609,18 @@ def enroll_face_from_frame(name, role, frame):
     # save image
     fname = FACES_DIR / f"{name}_{int(time.time())}.jpg"
     cv2.imwrite(str(fname), frame)
-    # insert to DB
-    conn = get_db_conn()
-    conn.execute("INSERT OR REPLACE INTO persons (name, role, face_path) VALUES (?,?,?)", (name, role, str(fname)))
-    conn.commit()
-    conn.close()
-    # reload known encs
-    global known_encodings, known_meta
-    known_encodings, known_meta = load_face_db()
+    # insert to DB and publish a new gallery tuple under the same lock as load_faces
+    # (workers may be reading the old tuple)
+    global gallery
+    with gallery_lock:
+        conn = get_db_conn()
+        conn.execute("INSERT OR REPLACE INTO persons (name, role, face_path) VALUES (?,?,?)", (name, role, str(fname)))
+        conn.execute("INSERT INTO face_embeddings (person_name, image_path, encoding) VALUES (?,?,?)",
+                     (name, str(fname), np.asarray(enc, dtype=np.float64).tobytes()))
+        conn.commit()
+        conn.close()
+        encs, metas = gallery
+        gallery = (encs + [enc], metas + [{"name": name, "role": role, "path": str(fname)}])
     return True, "Enrolamiento correcto"
 
 # main
@@ -516,13 +633,15 @@ def ensure_db():
                         id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, camera TEXT, track_id TEXT, person_name TEXT, role TEXT, confidence REAL, bbox TEXT, evidence TEXT)""")
     conn.execute("""CREATE TABLE IF NOT EXISTS track_bindings (
                         cam_id TEXT, track_id TEXT, person_name TEXT, bound_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, expires_at TIMESTAMP, PRIMARY KEY(cam_id,track_id))""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS face_embeddings (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT, person_name TEXT NOT NULL, image_path TEXT, image_sha1 TEXT UNIQUE, encoding BLOB NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
     conn.commit(); conn.close()
 
 if __name__ == "__main__":
     ensure_db()
+    loader.start()
     app = QtWidgets.QApplication(sys.argv)
     win = MainWindow()
     win.show()
-    # API thread
-    threading.Thread(target=run_api, daemon=True).start()
+    print(f"UI lista en {time.perf_counter() - T_START:.2f}s (modelo cargando en segundo plano)")
     sys.exit(app.exec_())
\ No newline at end of file
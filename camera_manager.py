@@ -0,0 +1,226 @@
+import os
+import json
+import threading
+from pathlib import Path
+
+# how long to wait for a stopped worker to release its capture (seconds)
+JOIN_TIMEOUT = float(os.getenv("CAM_JOIN_TIMEOUT", "5"))
+DEFAULT_PROCESS_EVERY = 3
+
+
+def normalize_source(src):
+    # "0" -> 0 (webcam index), everything else (rtsp://, files) stays as is
+    if isinstance(src, str) and src.strip().isdigit():
+        return int(src.strip())
+    return src
+
+
+def parse_cameras(data):
+    """
+    Accepts both cameras.json formats:
+      - {"cameras": [{"name": ..., "source": ..., "process_every": 3}, ...]}
+      - legacy {"<id>": "<source>", ...}
+    returns dict name -> spec {"source": ..., "process_every": ...}
+    raises ValueError on malformed config (nothing is applied in that case).
+    """
+    specs = {}
+    if isinstance(data, dict) and "cameras" in data:
+        entries = data["cameras"]
+        if not isinstance(entries, list):
+            raise ValueError("'cameras' debe ser una lista")
+        for cam in entries:
+            if not isinstance(cam, dict) or not cam.get("name") or cam.get("source") in (None, ""):
+                raise ValueError(f"Entrada de cámara inválida: {cam!r}")
+            name = str(cam["name"])
+            if name in specs:
+                raise ValueError(f"Cámara duplicada: {name}")
+            process_every = int(cam.get("process_every", DEFAULT_PROCESS_EVERY))
+            if process_every < 1:
+                raise ValueError(f"process_every debe ser >= 1 en cámara {name}")
+            specs[name] = {"source": normalize_source(cam["source"]), "process_every": process_every}
+    elif isinstance(data, dict):
+        for name, src in data.items():
+            if src in (None, ""):
+                raise ValueError(f"Fuente vacía para cámara {name}")
+            specs[str(name)] = {"source": normalize_source(src), "process_every": DEFAULT_PROCESS_EVERY}
+    else:
+        raise ValueError("cameras.json debe ser un objeto JSON")
+    return specs
+
+
+def load_cameras_file(path):
+    # raises OSError if the file is missing/unreadable; callers decide what that means
+    return parse_cameras(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def diff_cameras(old, new):
+    """returns (added, removed, changed) name lists between two spec dicts"""
+    added = [n for n in new if n not in old]
+    removed = [n for n in old if n not in new]
+    changed = [n for n in new if n in old and new[n] != old[n]]
+    return added, removed, changed
+
+
+class CameraManager:
+    """
+    Keeps the running camera workers in sync with cameras.json.
+    Only added/removed/changed cameras are touched on reload; unaffected
+    workers (and their streams) keep running.
+
+    start_worker(name, spec) -> worker (must expose stop(), wait(ms) and a finished signal)
+    on_removed(name, worker) -> called once a removed camera's worker has exited
+    (changed cameras are restarted under the same name, so they are not reported)
+
+    specs holds the configured cameras (what save() writes); running holds the
+    ones that actually have a worker (or a deferred start). Cameras whose worker
+    failed to start stay configured and are retried on the next reload.
+
+    Workers that do not finish within join_timeout (e.g. blocked on a dead RTSP
+    stream) stay referenced in pending until their finished signal; a camera
+    whose old worker is still pending is only started once it has exited, so
+    the capture (webcam index) is never opened twice.
+    """
+    def __init__(self, conf_path, start_worker, on_removed=None, join_timeout=JOIN_TIMEOUT):
+        self.conf_path = Path(conf_path)
+        self.start_worker = start_worker
+        self.on_removed = on_removed
+        self.join_timeout = join_timeout
+        self.specs = {}    # cam_name -> configured spec
+        self.running = {}  # cam_name -> spec of the started (or deferred) worker
+        self.workers = {}  # cam_name -> worker
+        self.pending = {}  # cam_name -> [stopped workers still running]
+        self.deferred = {} # cam_name -> spec waiting for its old worker to exit
+        self.lock = threading.Lock()
+        self._mtime = None
+
+    def _file_mtime(self):
+        try:
+            return self.conf_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def changed_on_disk(self):
+        return self._file_mtime() != self._mtime
+
+    def reload(self):
+        """
+        re-read cameras.json and apply the diff; if the file is missing, unreadable
+        or invalid (editor save, git checkout...) the current state is kept
+        """
+        mtime = self._file_mtime()
+        try:
+            specs = load_cameras_file(self.conf_path)
+        except (OSError, ValueError, TypeError) as e:
+            print("cameras.json no disponible o inválido, se mantiene la configuración actual:", e)
+            self._mtime = mtime  # retry on the next edit, not on every poll
+            return None
+        result = self.apply(specs)
+        self._mtime = mtime
+        return result
+
+    def apply(self, specs):
+        """applies a full set of camera specs, returns {"added":[...], "removed":[...], "changed":[...], "failed":[...]}"""
+        with self.lock:
+            added, removed, changed = diff_cameras(self.running, specs)
+            # new state is built aside and swapped in at the end
+            running = dict(self.running)
+            workers = dict(self.workers)
+            to_stop = [(n, workers.pop(n)) for n in removed + changed if n in workers]
+            for name in removed + changed:
+                running.pop(name, None)
+                self.deferred.pop(name, None)
+            # signal every worker first, then join, so stops run in parallel
+            for name, w in to_stop:
+                w.stop()
+            for name, w in to_stop:
+                if not w.wait(int(self.join_timeout * 1000)) and not self._keep_pending(name, w):
+                    # still running: on_removed is called from _on_finished
+                    print(f"Cámara {name}: el worker no terminó en {self.join_timeout}s, se libera al terminar")
+                    continue
+                if self.on_removed and name in removed:
+                    self.on_removed(name, w)
+            failed = []
+            for name in added + changed:
+                if self.pending.get(name):
+                    # old worker still holds the capture; started from _on_finished
+                    self.deferred[name] = specs[name]
+                    running[name] = specs[name]
+                    continue
+                try:
+                    workers[name] = self.start_worker(name, specs[name])
+                except Exception as e:
+                    # stays configured but not running, so the next reload retries it
+                    print(f"Cámara {name}: no se pudo iniciar:", e)
+                    failed.append(name)
+                    continue
+                running[name] = specs[name]
+            self.specs = dict(specs)
+            self.running = running
+            self.workers = workers
+        if added or removed or changed:
+            print(f"Cámaras: +{len(added)} -{len(removed)} ~{len(changed)}")
+        return {"added": added, "removed": removed, "changed": changed, "failed": failed}
+
+    def _keep_pending(self, name, w):
+        """
+        parks a worker that missed join_timeout until its finished signal.
+        Called with the lock held; returns True if it had already exited
+        (then it is not parked and the caller handles it as joined).
+        """
+        self.pending.setdefault(name, []).append(w)
+        w.finished.connect(lambda name=name, w=w: self._on_finished(name, w))
+        if w.wait(0):
+            # finished before the connection was made; _on_finished will find nothing to do
+            self._drop_pending(name, w)
+            return True
+        return False
+
+    def _drop_pending(self, name, w):
+        left = self.pending.get(name, [])
+        if w not in left:
+            return False
+        left.remove(w)
+        if not left:
+            self.pending.pop(name, None)
+        return True
+
+    def _on_finished(self, name, w):
+        # runs from the worker's finished signal (GUI thread), never from apply()
+        with self.lock:
+            if not self._drop_pending(name, w):
+                return
+            if self.on_removed and name not in self.specs:
+                self.on_removed(name, w)
+            if name in self.pending:
+                return
+            spec = self.deferred.pop(name, None)
+            if spec is None:
+                return
+            try:
+                self.workers[name] = self.start_worker(name, spec)
+                print(f"Cámara {name}: iniciada tras liberar el worker anterior")
+            except Exception as e:
+                print(f"Cámara {name}: no se pudo iniciar:", e)
+                self.running.pop(name, None)
+
+    def add(self, name, source, process_every=DEFAULT_PROCESS_EVERY):
+        specs = dict(self.specs)
+        specs[name] = {"source": normalize_source(source), "process_every": process_every}
+        return self.apply(specs)
+
+    def save(self):
+        data = {"cameras": [{"name": n, "source": s["source"], "process_every": s["process_every"]}
+                            for n, s in self.specs.items()]}
+        text = json.dumps(data, indent=2)
+        tmp = self.conf_path.with_suffix(".json.tmp")
+        try:
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, self.conf_path)
+        except OSError:
+            # e.g. cameras.json bind-mounted as a single file in docker: can't rename over it
+            tmp.unlink(missing_ok=True)
+            self.conf_path.write_text(text, encoding="utf-8")
+        self._mtime = self._file_mtime()
+
+    def stop_all(self):
+        self.apply({})
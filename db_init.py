@@ -47,6 +47,18 @@ CREATE TABLE IF NOT EXISTS track_bindings (
 )
 """)
 
+# face embeddings (several per person), filled by register_face.py and app enrollment
+c.execute("""
+CREATE TABLE IF NOT EXISTS face_embeddings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    person_name TEXT NOT NULL,
+    image_path TEXT,
+    image_sha1 TEXT UNIQUE,
+    encoding BLOB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+""")
+
 # Ejemplos iniciales (sin imágenes)
 examples = [
     ("Juan Perez","Empleado", None),
@@ -1,15 +1,26 @@
 import cv2
+import sys
+import csv
 import sqlite3
 import json
 import time
 import os
+import hashlib
+import argparse
+import urllib.request
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import face_recognition
 
 BASE = Path(__file__).parent
 FACES = BASE / "faces"
 FACES.mkdir(exist_ok=True)
 DB = BASE / "people.db"
+ROLES = ("Empleado", "Cliente", "Proveedor", "Invitado")
+IMG_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+MAX_SIDE = 1600  # larger images are downscaled before detection
+API_URL = os.getenv("CCTV_API", "http://127.0.0.1:5000")
 
 def enroll_cli():
     name = input("Nombre (ej: Juan Perez): ").strip()
@@ -39,5 +50,165 @@ def enroll_cli():
             break
     cap.release(); cv2.destroyAllWindows()
 
+# --- bulk enrollment -------------------------------------------------------
+
+def _images(folder):
+    return sorted(p for p in folder.rglob("*") if p.is_file() and p.suffix.lower() in IMG_EXTS)
+
+def scan_dir(root):
+    """
+    root/<Persona>/*.jpg          -> role = None (default role, only for new persons)
+    root/<Rol>/<Persona>/*.jpg    -> when the top folder is a known role
+    returns [(path, name, role or None)]
+    """
+    items = []
+    for top in sorted(p for p in root.iterdir() if p.is_dir()):
+        if top.name in ROLES:
+            for person in sorted(p for p in top.iterdir() if p.is_dir()):
+                items += [(img, person.name.replace("_", " "), top.name) for img in _images(person)]
+        else:
+            items += [(img, top.name.replace("_", " "), None) for img in _images(top)]
+    return items
+
+def read_manifest(csv_path, root):
+    """CSV with columns path,name[,role]; relative paths are resolved against root, empty role -> None"""
+    items = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            path = Path(row["path"].strip())
+            if not path.is_absolute():
+                path = root / path
+            items.append((path, row["name"].strip(), (row.get("role") or "").strip() or None))
+    return items
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def encode_image(path):
+    """runs in the pool: returns (path, encoding bytes or None, reject reason or None)"""
+    try:
+        return _encode_image(path)
+    except Exception as e:
+        # one bad image must not abort the whole batch
+        return path, None, f"error: {e}"
+
+def _encode_image(path):
+    img = cv2.imread(str(path))
+    if img is None:
+        return path, None, "no se pudo leer"
+    h, w = img.shape[:2]
+    if max(h, w) > MAX_SIDE:
+        scale = MAX_SIDE / max(h, w)
+        img = cv2.resize(img, (int(w*scale), int(h*scale)), interpolation=cv2.INTER_AREA)
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    boxes = face_recognition.face_locations(rgb)
+    if not boxes:
+        return path, None, "sin rostro"
+    if len(boxes) > 1:
+        return path, None, f"{len(boxes)} rostros"
+    enc = face_recognition.face_encodings(rgb, boxes)[0]
+    return path, np.asarray(enc, dtype=np.float64).tobytes(), None
+
+def ensure_tables(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS face_embeddings (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT, person_name TEXT NOT NULL, image_path TEXT, image_sha1 TEXT UNIQUE, encoding BLOB NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+    conn.commit()
+
+def store_results(conn, results, default_role="Empleado"):
+    # one transaction for every person/embedding
+    with conn:
+        for name, role, path, sha, enc in results:
+            if role:
+                # role from a <Rol>/ folder or the manifest: it wins
+                conn.execute("""INSERT INTO persons (name, role, face_path) VALUES (?,?,?)
+                                ON CONFLICT(name) DO UPDATE SET role=excluded.role,
+                                face_path=COALESCE(persons.face_path, excluded.face_path)""", (name, role, path))
+            else:
+                # default role only for new persons, existing ones keep theirs
+                conn.execute("""INSERT INTO persons (name, role, face_path) VALUES (?,?,?)
+                                ON CONFLICT(name) DO UPDATE SET
+                                face_path=COALESCE(persons.face_path, excluded.face_path)""", (name, default_role, path))
+            conn.execute("INSERT OR IGNORE INTO face_embeddings (person_name, image_path, image_sha1, encoding) VALUES (?,?,?,?)",
+                         (name, path, sha, enc))
+
+def notify_reload():
+    # single gallery refresh in the running app; otherwise it loads them on next start
+    try:
+        req = urllib.request.Request(API_URL + "/api/faces/reload", method="POST")
+        urllib.request.urlopen(req, timeout=3).close()
+        print("Galería recargada en la app")
+    except Exception as e:
+        print("No se pudo avisar a la app (se cargará al reiniciar):", e)
+
+def enroll_bulk(root, manifest=None, default_role="Empleado", workers=None, notify=True):
+    root = Path(root).resolve()
+    items = read_manifest(manifest, root) if manifest else scan_dir(root)
+    conn = sqlite3.connect(DB)
+    ensure_tables(conn)
+    enrolled = {r[0] for r in conn.execute("SELECT image_sha1 FROM face_embeddings WHERE image_sha1 IS NOT NULL")}
+    # resumable: skip images already enrolled (by content hash) and duplicates in this batch
+    todo, rejected, skipped = [], [], 0
+    for path, name, role in items:
+        if role is not None and role not in ROLES:
+            rejected.append((path, f"rol inválido: {role}")); continue
+        if not path.is_file():
+            rejected.append((path, "no existe")); continue
+        try:
+            sha = file_sha1(path)
+        except OSError as e:
+            rejected.append((path, f"no se pudo leer: {e}")); continue
+        if sha in enrolled:
+            skipped += 1; continue
+        enrolled.add(sha)
+        todo.append((path, name, role, sha))
+    print(f"{len(items)} imágenes: {len(todo)} por procesar, {skipped} ya enroladas, {len(rejected)} rechazadas")
+    results = []  # (name, role, path, sha, enc)
+    completed = False
+    try:
+        if todo:
+            meta = {str(p): (n, r, sha) for p, n, r, sha in todo}
+            chunk = max(1, len(todo) // ((workers or os.cpu_count() or 1) * 8))
+            pool = ProcessPoolExecutor(max_workers=workers)
+            try:
+                for i, (path, enc, reason) in enumerate(pool.map(encode_image, [str(t[0]) for t in todo], chunksize=chunk), 1):
+                    if enc is None:
+                        rejected.append((path, reason))
+                    else:
+                        name, role, sha = meta[path]
+                        results.append((name, role, path, sha, enc))
+                    if i % 50 == 0:
+                        print(f"  {i}/{len(todo)}")
+            finally:
+                # on Ctrl-C / errors do not wait for the queued images
+                pool.shutdown(wait=False, cancel_futures=True)
+        completed = True
+    finally:
+        # also on interruption: what is encoded so far is committed, the next run skips it by SHA-1
+        store_results(conn, results, default_role)
+        conn.close()
+        if not completed:
+            print(f"Interrumpido: {len(results)} imágenes guardadas, vuelve a ejecutar para continuar")
+    for path, reason in rejected:
+        print(f"  rechazada {path}: {reason}")
+    persons = len({r[0] for r in results})
+    print(f"Enroladas {len(results)} imágenes de {persons} personas; {len(rejected)} rechazadas; {skipped} omitidas")
+    if results and notify:
+        notify_reload()
+    return len(results), rejected
+
 if __name__ == "__main__":
-    enroll_cli()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "bulk":
+        ap = argparse.ArgumentParser(prog="register_face.py bulk", description="Enrolamiento masivo desde un directorio")
+        ap.add_argument("root", help="directorio: <Persona>/*.jpg o <Rol>/<Persona>/*.jpg")
+        ap.add_argument("--manifest", help="CSV con columnas path,name[,role]")
+        ap.add_argument("--role", default="Empleado", choices=ROLES, help="rol para personas nuevas sin carpeta <Rol>/ ni rol en el manifiesto")
+        ap.add_argument("--workers", type=int, default=None, help="procesos (por defecto: núcleos)")
+        ap.add_argument("--no-notify", action="store_true", help="no avisar a la app para recargar la galería")
+        args = ap.parse_args(sys.argv[2:])
+        enroll_bulk(args.root, args.manifest, args.role, args.workers, notify=not args.no_notify)
+    else:
+        enroll_cli()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import re
+import sys
+import time
+import importlib
+import threading
+import subprocess
+
+# lazily imported modules (name -> module)
+_modules = {}
+_modules_lock = threading.Lock()
+
+
+def lazy_import(name):
+    """imports a heavy dependency on first use (thread-safe), cached afterwards"""
+    mod = _modules.get(name)
+    if mod is None:
+        with _modules_lock:
+            mod = _modules.get(name)
+            if mod is None:
+                mod = importlib.import_module(name)
+                _modules[name] = mod
+    return mod
+
+
+class BackgroundLoader:
+    """
+    Runs named loading steps (model, tracker, face gallery...) in order on a
+    daemon thread so the UI and cameras can come up meanwhile.
+    ready is set once every step has finished (even if some failed).
+    """
+    def __init__(self):
+        self.steps = []     # [(name, fn)]
+        self.results = {}   # name -> return value
+        self.errors = {}    # name -> str(exception)
+        self.timings = {}   # name -> seconds
+        self.current = None
+        self.ready = threading.Event()
+        self._thread = None
+
+    def add(self, name, fn):
+        self.steps.append((name, fn))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="background-loader", daemon=True)
+            self._thread.start()
+        return self
+
+    def run_sync(self):
+        # for tools that need the stack right away
+        self._run()
+        return self
+
+    def _run(self):
+        for name, fn in self.steps:
+            if name in self.results or name in self.errors:
+                continue
+            self.current = name
+            t0 = time.perf_counter()
+            try:
+                self.results[name] = fn()
+            except Exception as e:
+                self.errors[name] = str(e)
+                print(f"Carga '{name}' falló:", e)
+            self.timings[name] = round(time.perf_counter() - t0, 3)
+            print(f"Carga '{name}' lista en {self.timings[name]}s")
+        self.current = None
+        self.ready.set()
+
+    def wait(self, timeout=None):
+        return self.ready.wait(timeout)
+
+    def ok(self, name):
+        return name in self.results
+
+    def status(self):
+        return {"ready": self.ready.is_set(),
+                "loading": self.current,
+                "done": [n for n, _ in self.steps if n in self.results],
+                "errors": dict(self.errors),
+                "timings": dict(self.timings)}
+
+
+def importtime_report(target="app", top=20):
+    """
+    Runs `python -X importtime -c "import <target>"` in a fresh interpreter and
+    returns (total_seconds, [(cumulative_us, self_us, module)]) sorted by cumulative time.
+    """
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                          capture_output=True, text=True)
+    total = time.perf_counter() - t0
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+        if m:
+            rows.append((int(m.group(2)), int(m.group(1)), m.group(3), m.group(4)))
+    # only top-level imports for the ranking (nested ones are included in them)
+    min_indent = min((len(r[2]) for r in rows), default=0)
+    ranked = sorted(((c, s, mod) for c, s, ind, mod in rows if len(ind) == min_indent), reverse=True)
+    if proc.returncode != 0:
+        print(proc.stderr.splitlines()[-1] if proc.stderr else f"import {target} falló")
+    return total, ranked[:top]
+
+
+def print_importtime(target="app", top=20):
+    total, ranked = importtime_report(target, top)
+    print(f"import {target}: {total:.2f}s (incluye arranque del intérprete)")
+    print(f"{'acumulado ms':>12} {'propio ms':>10}  módulo")
+    for cum, own, mod in ranked:
+        print(f"{cum/1000:12.1f} {own/1000:10.1f}  {mod}")
+
+
+if __name__ == "__main__":
+    # python startup.py importtime [module] [top]
+    if len(sys.argv) >= 2 and sys.argv[1] == "importtime":
+        target = sys.argv[2] if len(sys.argv) > 2 else "app"
+        top = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+        print_importtime(target, top)
+    else:
+        print("Uso: python startup.py importtime [modulo] [top]")